@@ -3,18 +3,66 @@ Alternative data source for Israeli indices using web scraping.
 This module provides a fallback when Yahoo Finance rate limiting is too aggressive.
 """
 
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
 import re
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from loguru import logger
 
+_TARGETS = ('TA-35', 'TA-125', 'TA-90', 'BANKS')
+_PRICE_RE = re.compile(r'^(\d[\d,]*(?:\.\d+)?)$')
+_PCT_RE = re.compile(r'^\+?(-?\d+(?:\.\d+)?)%?$')
+
+# Shared session keeps the connection to Investing.com alive between scrapes
+_SESSION = requests.Session()
+
+# Last successful scrape and when it was taken, reused for SCRAPE_TTL seconds
+_scrape_cache: Optional[Tuple[Dict[str, Dict[str, float]], float]] = None
+SCRAPE_TTL = 60
+# Serializes scrapes (and use of _SESSION) across fetch_all's worker threads
+_scrape_lock = threading.Lock()
+_last_scrape_attempt = 0.0
+
+
+def _fresh_scrape() -> Optional[Dict[str, Dict[str, float]]]:
+    """The cached scrape if it is younger than SCRAPE_TTL seconds."""
+    if _scrape_cache is not None:
+        cached_data, timestamp = _scrape_cache
+        if time.time() - timestamp < SCRAPE_TTL:
+            return cached_data
+    return None
+
 
 def scrape_investing_indices() -> Dict[str, Dict[str, float]]:
     """
     Scrape Israeli indices data from Investing.com as a fallback.
-    Returns a dictionary with index data.
+    Returns a dictionary with index data, keyed by upper-cased index name.
+    Successful results are cached for SCRAPE_TTL seconds; concurrent callers share one scrape.
     """
+    global _last_scrape_attempt
+    cached_data = _fresh_scrape()
+    if cached_data is not None:
+        return cached_data
+
+    waiting_since = time.time()
+    with _scrape_lock:
+        # Another thread may have scraped while this one waited for the lock
+        cached_data = _fresh_scrape()
+        if cached_data is not None:
+            return cached_data
+        if _last_scrape_attempt >= waiting_since:
+            return {}  # ...and failed; don't hit the page again straight away
+        try:
+            return _scrape_investing_page()
+        finally:
+            _last_scrape_attempt = time.time()
+
+
+def _scrape_investing_page() -> Dict[str, Dict[str, float]]:
+    """Fetch and parse the Investing.com page, caching the result on success."""
+    global _scrape_cache
     try:
         # Investing.com Israeli indices page
         url = "https://www.investing.com/indices/israel-indices"
@@ -23,38 +71,45 @@ def scrape_investing_indices() -> Dict[str, Dict[str, float]]:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _SESSION.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        root = lxml.html.fromstring(response.content)
         
         # Find the indices table
         indices_data = {}
         
         # Look for specific indices in the page
         # This is a simplified approach - in production you'd need more robust parsing
-        for row in soup.find_all('tr'):
-            cells = row.find_all('td')
+        for row in root.xpath('//tr[count(td) >= 3]'):
+            cells = row.xpath('./td')
             if len(cells) >= 3:
-                name_cell = cells[0].get_text(strip=True)
-                price_cell = cells[1].get_text(strip=True)
-                change_cell = cells[2].get_text(strip=True)
+                name_cell = cells[0].text_content().strip()
+                price_cell = cells[1].text_content().strip()
+                change_cell = cells[2].text_content().strip()
                 
                 # Look for Israeli indices
-                if any(index in name_cell.upper() for index in ['TA-35', 'TA-125', 'TA-90', 'BANKS']):
+                name_upper = name_cell.upper()
+                if any(index in name_upper for index in _TARGETS):
                     try:
                         # Extract price (remove commas and convert to float)
-                        price = float(price_cell.replace(',', ''))
+                        price_match = _PRICE_RE.match(price_cell)
+                        if not price_match:
+                            raise ValueError(f"unexpected price {price_cell!r}")
+                        price = float(price_match.group(1).replace(',', ''))
                         
                         # Extract percentage change
                         change_pct = 0.0
                         if change_cell and change_cell != '-':
-                            change_pct = float(change_cell.replace('%', '').replace('+', ''))
+                            pct_match = _PCT_RE.match(change_cell)
+                            if not pct_match:
+                                raise ValueError(f"unexpected change {change_cell!r}")
+                            change_pct = float(pct_match.group(1))
                         
                         # Calculate previous close
                         prev_close = price / (1 + change_pct / 100) if change_pct != 0 else price
                         
-                        indices_data[name_cell] = {
+                        indices_data[name_upper] = {
                             'price': price,
                             'prev_close': prev_close,
                             'change_pct': change_pct
@@ -66,6 +121,7 @@ def scrape_investing_indices() -> Dict[str, Dict[str, float]]:
                         logger.warning(f"Failed to parse data for {name_cell}: {e}")
                         continue
         
+        _scrape_cache = (indices_data, time.time())
         return indices_data
         
     except Exception as e:
@@ -81,9 +137,12 @@ def get_index_data_from_alternative_source(index_name: str) -> Optional[Dict[str
         # Try Investing.com first
         data = scrape_investing_indices()
         
-        # Look for the specific index
+        # Keys are stored upper-cased; try an exact hit before a substring scan
+        key = index_name.upper()
+        if key in data:
+            return data[key]
         for name, values in data.items():
-            if index_name.upper() in name.upper():
+            if key in name:
                 return values
         
         # If not found, try other sources or return None
@@ -9,20 +9,44 @@ Responsibilities:
 """
 
 from __future__ import annotations
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Iterable, Optional
+import re
+import time
 import pendulum
 from tase_calendar import TradingDayInfo
 
+# Characters MarkdownV2 requires escaping in plain text
+_MD2_ESCAPE = re.compile(r"([_*\[\]()~`>#+\-=|{}.!,\\])")
+# The numeric part of a quote line only ever contains these reserved characters
+_NUM_ESCAPE = str.maketrans({c: "\\" + c for c in "+-.,()"})
 
-def _fmt_num(x: float, digits: int = 2) -> str:
-    """Format a number with thousands separators and fixed decimals."""
-    return f"{x:,.{digits}f}"
+# Indexed by sign(change_pct) + 1: down, flat, up
+_EMOJI = ("🔴", "⚪", "🟢")
 
+_DISCLAIMER = "_הערה: ייתכן עיכוב של עד 15 דקות בעדכון הנתונים\\._"
 
-def _fmt_pct(x: float, digits: int = 2) -> str:
-    """Format a percentage with an explicit sign."""
-    sign = "+" if x >= 0 else ""
-    return f"{sign}{x:.{digits}f}%"
+# Separator and promotional content, identical for every message
+_FOOTER = "\n\n" + "\n".join([
+    "*הטבה לפתיחת חשבון מסחר במיטב טרייד* 📈: https://bit\\.ly/ValueInvestingInIsrael",
+    "*הטבה לחברי הקהילה עם סוכן פיננסי \\+ החזר מס בתנאים מעולים* 💰: https://surense\\.com/app/p/BcR6zrV",
+    "",
+    "*השקעות ערך בישראל* 🇮🇱: https://t\\.me/israelValueInvestments",
+    "*קבוצת הדיונים*: https://t\\.me/ValueInvestingIsrael",
+])
+
+
+@lru_cache(maxsize=8)
+def _escaped_labels(names: tuple) -> tuple:
+    """MarkdownV2-escaped index names; the configured set repeats every refresh."""
+    return tuple(_MD2_ESCAPE.sub(r"\\\1", name) for name in names)
+
+
+@lru_cache(maxsize=8)
+def _now_hhmm(tz: str, minute_bucket: int) -> str:
+    """Current HH:MM in `tz`, memoized per wall-clock minute."""
+    return pendulum.now(tz).format("HH:mm")
 
 
 def build_message(
@@ -32,18 +56,16 @@ def build_message(
     day_info: Optional[TradingDayInfo] = None,
 ) -> str:
     """Assemble the full MarkdownV2 message body."""
+    quotes = quotes if isinstance(quotes, (list, tuple)) else list(quotes)
     header = []
     day_info = day_info or TradingDayInfo(is_trading=not market_closed)
 
     # Add a note for shortened trading days
     if day_info.is_trading and day_info.is_short:
-        stop_time_str = day_info.stop_time.strftime("%H:%M")
         reason_str = f" \\({day_info.reason}\\)" if day_info.reason else ""
         # Calculate the time 20 minutes before stop_time
-        stop_hour, stop_minute = map(int, stop_time_str.split(':'))
-        total_minutes = stop_hour * 60 + stop_minute - 20
-        adjusted_hour, adjusted_minute = divmod(total_minutes, 60)
-        adjusted_stop_time = f"{adjusted_hour:02d}:{adjusted_minute:02d}"
+        adjusted = datetime.combine(date.today(), day_info.stop_time) - timedelta(minutes=20)
+        adjusted_stop_time = adjusted.strftime("%H:%M")
         header.append(f"_יום מסחר מקוצר עד {adjusted_stop_time}{reason_str}_")
 
     # Special message for non-trading days
@@ -53,7 +75,7 @@ def build_message(
         lines = header
     # Regular trading day, but market is currently closed
     elif market_closed:
-        first_quote = next(iter(quotes), None)
+        first_quote = quotes[0] if quotes else None
         if first_quote and first_quote.price_date:
             date_str = pendulum.instance(first_quote.price_date).in_timezone(tz).format("DD/MM/YYYY")
             header.append("*המסחר בבורסה סגור כעת\\.*")
@@ -67,7 +89,7 @@ def build_message(
         lines = header
     # Regular, open trading day
     else:
-        now = pendulum.now(tz).format("HH:mm")
+        now = _now_hhmm(tz, int(time.time()) // 60)
         title = f"*מדדי ת״א – שינוי יומי* _\\(עודכן: {now}\\)_ 📊📉📈"
         
         header.append(title)
@@ -75,28 +97,15 @@ def build_message(
 
     # Don't add index data if it's a non-trading day
     if day_info.is_trading:
-        for q in quotes:
-            # Choose emoji based on change percentage
-            if q.change_pct > 0:
-                emoji = "🟢"
-            elif q.change_pct < 0:
-                emoji = "🔴"
-            else:
-                emoji = "⚪"
-            # Escape special characters for MarkdownV2
-            name_escaped = q.name.replace("-", "\\-")
-            price_formatted = _fmt_num(q.price, 2).replace(",", "\\,").replace(".", "\\.")
-            pct_formatted = _fmt_pct(q.change_pct).replace(".", "\\.").replace("+", "\\+").replace("-", "\\-")
-            lines.append(f"{emoji} {name_escaped}: {pct_formatted} \\({price_formatted}\\)")
-        lines.append("_הערה: ייתכן עיכוב של עד 15 דקות בעדכון הנתונים\\._")
-    
-    # Add separator and promotional content
-    lines.append("")
-
-    lines.append("*הטבה לפתיחת חשבון מסחר במיטב טרייד* 📈: https://bit\\.ly/ValueInvestingInIsrael")
-    lines.append("*הטבה לחברי הקהילה עם סוכן פיננסי \\+ החזר מס בתנאים מעולים* 💰: https://surense\\.com/app/p/BcR6zrV")
-    lines.append("")
-    lines.append("*השקעות ערך בישראל* 🇮🇱: https://t\\.me/israelValueInvestments")
-    lines.append("*קבוצת הדיונים*: https://t\\.me/ValueInvestingIsrael")
-    
-    return "\n".join(lines)
+        labels = _escaped_labels(tuple(q.name for q in quotes))
+        body = [None] * len(quotes)
+        for i, q in enumerate(quotes):
+            # Choose emoji based on the sign of the change percentage
+            emoji = _EMOJI[(q.change_pct > 0) - (q.change_pct < 0) + 1]
+            numbers = f"{q.change_pct:+.2f}% ({q.price:,.2f})".translate(_NUM_ESCAPE)
+            body[i] = f"{emoji} {labels[i]}: {numbers}"
+        if body:
+            lines.append("\n".join(body))
+        lines.append(_DISCLAIMER)
+
+    return "\n".join(lines) + _FOOTER
@@ -3,51 +3,56 @@ indices.py
 ----------
 Data fetching and basic transformation for index quotes.
 
-For MVP we use `yfinance`:
-- Fetch a recent intraday last price (1m/5m fallback).
-- Fetch a previous close (from daily history) to compute daily % change.
+We read Yahoo Finance's public JSON endpoints directly:
+- A single spark batch request for last price and previous close of all symbols.
+- Per-symbol chart requests as a fallback: a recent intraday last price
+  (1m/5m fallback) and a previous close from daily history.
 
 If data is missing (common with certain symbols), we attempt a simple fallback
 for TA-125 variants. You can extend `ALT_SYMBOLS` for other indices if needed.
 """
 
 from __future__ import annotations
-from typing import Optional, Iterable, List, Dict, Tuple
-import math
-import os
+from typing import Callable, Optional, Iterable, List, Dict, Tuple, TypeVar
+import hashlib
+import random
+import threading
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import date, datetime, timezone
+from urllib.parse import quote, urlencode
+from zoneinfo import ZoneInfo
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Work around yfinance's optional curl_cffi transport causing attribute errors in some environments
-# This MUST be set before any yfinance import
-os.environ["YF_USE_CURL_CFFI"] = "false"
-os.environ["YF_DISABLE_CURL_CFFI"] = "true"
-os.environ["YF_USE_CTX"] = "false"
-
-# Additional workarounds for curl_cffi issues
 try:
-    import curl_cffi
-    # Disable curl_cffi completely if it's causing issues
-    os.environ["CURL_CA_BUNDLE"] = ""
+    from orjson import loads as _json_loads
 except ImportError:
-    pass
+    from json import loads as _json_loads
 
 from loguru import logger
-import yfinance as yf
 
-# Import alternative data source with error handling
-try:
-    from .alternative_data_source import get_index_data_from_alternative_source
-except ImportError:
-    # Fallback if alternative_data_source is not available
-    def get_index_data_from_alternative_source(name: str):
-        return None
+from tase_calendar import get_trading_day_info
 
-# Simple in-memory cache with TTL
+
+# Simple in-memory cache with TTL, shared by fetch workers and background refreshes
 _cache: Dict[str, Tuple[IndexQuote, float]] = {}
+_cache_lock = threading.Lock()
 CACHE_TTL = 300  # 5 minutes
+# Past CACHE_TTL a quote may still be served for this long while it refreshes in the background
+STALE_TTL = 900  # 15 minutes
+# Indices that came back empty from every source are not retried for NEG_TTL seconds
+_negative_cache: Dict[str, float] = {}
+NEG_TTL = 60
+_refreshing: set[str] = set()
+_refreshing_lock = threading.Lock()
+
+# Previous closes only change once per trading day, so cache them by (symbol, local date)
+_MARKET_TZ = ZoneInfo("Asia/Jerusalem")
+_prev_close_cache: Dict[Tuple[str, date], float] = {}
 
 ALT_SYMBOLS = {
     # If the primary symbol fails, try alternatives in order
@@ -59,257 +64,504 @@ ALT_SYMBOLS = {
 
 
 SPARK_URL = "https://query1.finance.yahoo.com/v7/finance/spark"
-_SPARK_DEFAULT_PARAMS = {"range": "1d", "interval": "1m"}
+# Only the per-symbol meta block is read; hourly bars keep the unused close/timestamp arrays tiny
+_SPARK_DEFAULT_PARAMS = {"range": "1d", "interval": "1h"}
 _SPARK_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
 }
 _SPARK_TIMEOUT = 10.0
+# Yahoo rejects spark requests naming more than 20 symbols
+_SPARK_MAX_SYMBOLS = 20
+# Digest of the raw spark bytes behind the last fetch_all, when spark alone covered every index
+_spark_digest: Optional[bytes] = None
 
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
 
-def _fetch_spark_batch(symbols: Iterable[str]) -> Dict[str, Dict[str, float]]:
-    '''Fetch last price and previous close for a batch of tickers via Yahoo spark API.'''
-    tickers = sorted({s.strip() for s in symbols if s})
-    if not tickers:
-        return {}
+# Indices missing from the spark batch are fetched one per worker
+_FETCH_WORKERS = 4
+
+# Connection-level failures are retried by the adapter; HTTP errors go through the retry loops below
+_RETRY = Retry(total=2, connect=2, read=0, backoff_factor=0.5, allowed_methods=frozenset({"GET"}))
+# Each worker may also have a previous-close request in flight, so pool two connections per worker
+_ADAPTER = HTTPAdapter(max_retries=_RETRY, pool_connections=2, pool_maxsize=2 * _FETCH_WORKERS)
+
+# One keep-alive session for every Yahoo request, pooled for the fallback workers
+_session = requests.Session()
+_session.mount("https://", _ADAPTER)
+
+# Retry sleeps use decorrelated jitter: uniform(base, 3 * previous), capped here
+_RETRY_MAX_DELAY = 30.0
+_RETRY_ATTEMPTS = 2
+_RETRY_BASE_DELAY = 1.0
+
+_T = TypeVar("_T")
+
+
+class _TokenBucket:
+    """Thread-safe token bucket: bursts up to `capacity`, refills at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        """Hold back all admissions for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+# Admission control for per-symbol Yahoo requests (replaces the old fixed 1s pause)
+_yahoo_bucket = _TokenBucket(rate=2.0, capacity=4)
+
+
+class _CircuitBreaker:
+    """
+    Stops calling Yahoo after `threshold` failures within `window` seconds.
+    Stays open for `cooldown` seconds, then lets a single probe through (half-open).
+    """
+
+    __slots__ = ("threshold", "window", "cooldown", "fail", "last_open", "state", "_lock")
+
+    def __init__(self, threshold: int, window: float, cooldown: float):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.fail: List[float] = []
+        self.last_open = 0.0
+        self.state = "closed"
+        self._lock = threading.Lock()
+
+    def before(self) -> bool:
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.last_open >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+
+    def on_fail(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.fail = [t for t in self.fail if now - t < self.window]
+            self.fail.append(now)
+            if self.state == "half_open" or len(self.fail) >= self.threshold:
+                if self.state != "open":
+                    logger.warning(f"Yahoo circuit open for {self.cooldown:.0f}s after repeated rate limiting")
+                self.state = "open"
+                self.last_open = now
+
+    def on_ok(self) -> None:
+        with self._lock:
+            self.fail.clear()
+            self.state = "closed"
+
+    def on_error(self) -> None:
+        """A request failed for another reason (timeout, 5xx, bad symbol); a failed probe re-opens the circuit."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.last_open = time.monotonic()
+
+
+_yahoo_breaker = _CircuitBreaker(threshold=5, window=60.0, cooldown=120.0)
+
+
+@lru_cache(maxsize=32)
+def _canonical_tickers(symbols: frozenset) -> Tuple[str, ...]:
+    """Stripped, de-duplicated, sorted tickers; the configured set rarely changes between calls."""
+    return tuple(sorted({s.strip() for s in symbols if s}))
+
+
+@lru_cache(maxsize=32)
+def _spark_url(tickers: Tuple[str, ...]) -> str:
+    """Full spark URL for one chunk; the query string only changes with the ticker set."""
+    return f"{SPARK_URL}?{urlencode({**_SPARK_DEFAULT_PARAMS, 'symbols': ','.join(tickers)})}"
+
+
+def _fetch_spark_batch(symbols: Iterable[str], digest=None) -> Dict[str, Dict[str, float]]:
+    '''
+    Fetch last price and previous close for a batch of tickers via Yahoo spark API.
+    Raw response bytes are fed to `digest` (a hashlib object) when given.
+    '''
+    tickers = _canonical_tickers(frozenset(symbols))
+    results: Dict[str, Dict[str, float]] = {}
+    for start in range(0, len(tickers), _SPARK_MAX_SYMBOLS):
+        results.update(_fetch_spark_chunk(tickers[start:start + _SPARK_MAX_SYMBOLS], digest))
+
+    missing = sorted(set(tickers) - set(results))
+    if missing:
+        logger.debug(f"Yahoo spark missing data for: {missing}")
+
+    return results
 
-    params = dict(_SPARK_DEFAULT_PARAMS)
-    params["symbols"] = ",".join(tickers)
+
+def _fetch_spark_chunk(tickers: Tuple[str, ...], digest=None) -> Dict[str, Dict[str, float]]:
+    '''One spark request for at most _SPARK_MAX_SYMBOLS tickers.'''
+    if not _yahoo_breaker.before():
+        logger.info("Yahoo circuit open; skipping spark request")
+        return {}
 
     try:
-        response = requests.get(
-            SPARK_URL,
-            params=params,
+        response = _session.get(
+            _spark_url(tickers),
             headers=_SPARK_HEADERS,
             timeout=_SPARK_TIMEOUT,
         )
+        if response.status_code == 429:
+            _yahoo_breaker.on_fail()
         response.raise_for_status()
     except Exception as exc:  # noqa: BLE001 - we want to log any failure here
+        _yahoo_breaker.on_error()
         logger.warning(f"Yahoo spark request failed: {exc}")
         return {}
 
+    results: Dict[str, Dict[str, float]] = {}
     try:
-        payload = response.json()
-    except ValueError as exc:
+        payload = _json_loads(response.content)
+        for item in (payload.get("spark") or {}).get("result") or []:
+            symbol = item.get("symbol")
+            responses = item.get("response") or []
+            if not symbol or not responses:
+                continue
+
+            meta = responses[0].get("meta") or {}
+            price = meta.get("regularMarketPrice")
+            prev_close = meta.get("previousClose") or meta.get("chartPreviousClose")
+            market_time = meta.get("regularMarketTime")
+
+            if price is None or prev_close is None or market_time is None:
+                continue
+
+            results[symbol] = {
+                "price": float(price),
+                "prev_close": float(prev_close),
+                "timestamp": int(market_time),
+            }
+    except (ValueError, TypeError, AttributeError) as exc:
+        # Malformed bodies must still settle the breaker, or a failed probe leaves it half-open
+        _yahoo_breaker.on_error()
         logger.warning(f"Failed to decode Yahoo spark response: {exc}")
         return {}
+    if digest is not None:
+        digest.update(response.content)
 
-    results: Dict[str, Dict[str, float]] = {}
-    for item in payload.get("spark", {}).get("result", []):
-        symbol = item.get("symbol")
-        responses = item.get("response") or []
-        if not symbol or not responses:
-            continue
-
-        meta = responses[0].get("meta") or {}
-        price = meta.get("regularMarketPrice")
-        prev_close = meta.get("previousClose") or meta.get("chartPreviousClose")
-        market_time = meta.get("regularMarketTime")
-
-        if price is None or prev_close is None or market_time is None:
-            continue
-
-        results[symbol] = {
-            "price": float(price),
-            "prev_close": float(prev_close),
-            "timestamp": int(market_time),
-        }
-
-    missing = sorted(set(tickers) - set(results))
-    if missing:
-        logger.debug(f"Yahoo spark missing data for: {missing}")
+    if results:
+        _yahoo_breaker.on_ok()
+    else:
+        _yahoo_breaker.on_fail()
 
     return results
 
 
-def _get_cached_data(cache_key: str) -> Optional[IndexQuote]:
-    """Get data from cache if it's still valid."""
-    if cache_key in _cache:
-        quote, timestamp = _cache[cache_key]
-        if time.time() - timestamp < CACHE_TTL:
-            logger.info(f"Using cached data for {cache_key}")
-            return quote
-        else:
+def _fetch_chart(symbol: str, range_: str, interval: str) -> Optional[dict]:
+    '''Fetch the chart result object (meta, timestamps, indicators) for one ticker via Yahoo chart API.'''
+    if not _yahoo_breaker.before():
+        logger.debug(f"Yahoo circuit open; skipping chart request for {symbol}")
+        return None
+
+    _yahoo_bucket.acquire()
+    try:
+        response = _session.get(
+            CHART_URL.format(symbol=quote(symbol, safe="")),
+            params={"range": range_, "interval": interval},
+            headers=_SPARK_HEADERS,
+            timeout=_SPARK_TIMEOUT,
+        )
+        retry_after = response.headers.get("Retry-After", "")
+        if response.status_code == 429:
+            _yahoo_breaker.on_fail()
+            if retry_after.isdigit():
+                # Long outages are the circuit breaker's job; don't park every worker for an hour
+                pause = min(float(retry_after), _RETRY_MAX_DELAY)
+                logger.warning(f"Yahoo rate limited {symbol}; pausing requests for {pause:.0f}s")
+                _yahoo_bucket.penalize(pause)
+        response.raise_for_status()
+        results = _json_loads(response.content).get("chart", {}).get("result") or []
+    except Exception:
+        _yahoo_breaker.on_error()
+        raise
+    _yahoo_breaker.on_ok()
+
+    return results[0] if results else None
+
+
+def _fetch_chart_closes(symbol: str, range_: str, interval: str) -> List[Tuple[datetime, float]]:
+    '''Fetch (timestamp, close) bars for one ticker via Yahoo chart API, skipping empty bars.'''
+    result = _fetch_chart(symbol, range_, interval)
+    if not result:
+        return []
+
+    timestamps = result.get("timestamp") or []
+    quotes = result.get("indicators", {}).get("quote") or [{}]
+    closes = quotes[0].get("close") or []
+    return [
+        (datetime.fromtimestamp(ts, tz=timezone.utc), float(close))
+        for ts, close in zip(timestamps, closes)
+        if close is not None
+    ]
+
+
+def _get_cached_data(cache_key: str, max_age: float = CACHE_TTL) -> Optional[IndexQuote]:
+    """Get data from cache if it is younger than `max_age` seconds."""
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        if entry is None:
+            return None
+        quote, timestamp = entry
+        age = time.time() - timestamp
+        if age >= STALE_TTL:
             # Remove expired entry
             del _cache[cache_key]
+    if age < max_age:
+        logger.info(f"Using cached data for {cache_key}")
+        return quote
     return None
 
 
 def _cache_data(cache_key: str, quote: IndexQuote) -> None:
-    """Cache the data with current timestamp."""
-    _cache[cache_key] = (quote, time.time())
-    logger.info(f"Cached data for {cache_key}")
+    """
+    Cache the data with current timestamp, unless the cached quote is from a later bar
+    or is dated while the new one (e.g. from the alternative source) is not.
+    """
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+        keep_cached = (
+            cached is not None
+            and cached[0].price_date is not None
+            and (quote.price_date is None or quote.price_date.timestamp() < cached[0].price_date.timestamp())
+        )
+        if not keep_cached:
+            _cache[cache_key] = (quote, time.time())
+            _negative_cache.pop(cache_key, None)
+        elif quote.price_date is not None:
+            _cache[cache_key] = (cached[0], time.time())
+        # An undated quote doesn't vouch for the cached one, so that entry keeps ageing out
+    if keep_cached:
+        logger.info(f"Keeping newer cached data for {cache_key}")
+    else:
+        logger.info(f"Cached data for {cache_key}")
+
+
+def _refresh_in_background(name: str, symbol: str) -> None:
+    """Re-fetch one index on a daemon thread, at most one refresh per index at a time."""
+    cache_key = f"{name}_{symbol}"
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def _run() -> None:
+        try:
+            _fetch_index_direct(name, symbol)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
+
+    logger.info(f"Serving stale data for {cache_key} while refreshing in the background")
+    threading.Thread(target=_run, name=f"refresh-{cache_key}", daemon=True).start()
 
 
 class IndexQuote:
     """In-memory representation of a single index quote and its derived fields."""
 
+    __slots__ = ("name", "symbol", "price", "prev_close", "price_date", "_change_pct")
+
     def __init__(self, name: str, symbol: str, price: float, prev_close: float, price_date: Optional[datetime] = None):
         self.name = name
         self.symbol = symbol
         self.price = float(price)
         self.prev_close = float(prev_close)
         self.price_date = price_date
+        # Computed once here; formatting reads it several times per quote
+        if self.prev_close != 0.0:
+            self._change_pct = (self.price / self.prev_close - 1.0) * 100.0
+        else:
+            self._change_pct = 0.0
 
     @property
     def change_pct(self) -> float:
         """Daily percentage change vs previous close."""
-        if self.prev_close and not math.isclose(self.prev_close, 0.0):
-            return (self.price / self.prev_close - 1.0) * 100.0
-        return 0.0
-
+        return self._change_pct
 
-def _try_get_prev_close(symbol: str) -> Optional[float]:
-    """Fetch previous close from recent daily candles with retry logic."""
-    import random
 
-    max_retries = 2
-    base_delay = 1.0
-
-    for attempt in range(max_retries):
+def _with_retries(what: str, fetch: Callable[[], _T]) -> Optional[_T]:
+    """Call `fetch`, retrying on exceptions with decorrelated jitter; None once attempts run out."""
+    delay = _RETRY_BASE_DELAY
+    for attempt in range(_RETRY_ATTEMPTS):
         try:
-            hist = yf.download(
-                symbol,
-                period="7d",
-                interval="1d",
-                progress=False,
-                auto_adjust=False,
-            )
-            if hist is None or hist.empty:
-                logger.warning(f"No historical data available for {symbol}")
-                return None
-
-            closes = hist["Close"]
-            if getattr(closes, "ndim", 1) > 1:
-                closes = closes.iloc[:, 0]
-            closes = closes.dropna()
-
-            if closes.empty:
-                logger.warning(f"No close prices found for {symbol}")
-                return None
-
-            if len(closes) >= 2:
-                return float(closes.iloc[-2])
-            return float(closes.iloc[-1])
+            return fetch()
         except Exception as exc:
-            if attempt < max_retries - 1:
-                delay = base_delay + random.uniform(0, 0.5)
-                logger.warning(f"Failed to get {symbol} prev close (attempt {attempt + 1}): {exc}. Retrying in {delay:.1f}s...")
+            if attempt < _RETRY_ATTEMPTS - 1:
+                delay = min(_RETRY_MAX_DELAY, random.uniform(_RETRY_BASE_DELAY, delay * 3))
+                logger.warning(f"Failed to get {what} (attempt {attempt + 1}): {exc}. Retrying in {delay:.1f}s...")
                 time.sleep(delay)
             else:
-                logger.warning(f"Failed to get {symbol} prev close after {max_retries} attempts: {exc}")
-                return None
+                logger.warning(f"Failed to get {what} after {_RETRY_ATTEMPTS} attempts: {exc}")
     return None
 
 
-def _try_get_last_price(symbol: str) -> Optional[Tuple[float, datetime]]:
-    """Fetch the latest intraday close price with retry logic."""
-    import random
+def _try_get_daily_closes(symbol: str) -> Optional[List[Tuple[datetime, float]]]:
+    """Fetch recent daily (timestamp, close) candles with retry logic."""
+    closes = _with_retries(f"{symbol} daily closes", lambda: _fetch_chart_closes(symbol, "7d", "1d"))
+    if not closes:
+        logger.warning(f"No close prices found for {symbol}")
+        return None
+    return closes
 
-    max_retries = 2
-    base_delay = 1.0
 
-    for period, interval in [("1d", "1m"), ("5d", "5m")]:
-        for attempt in range(max_retries):
-            try:
-                hist = yf.download(
-                    symbol,
-                    period=period,
-                    interval=interval,
-                    progress=False,
-                    auto_adjust=False,
-                )
-                if hist is None or hist.empty:
-                    logger.debug(f"No intraday data returned for {symbol} at {period}/{interval}")
-                    break
-
-                closes = hist["Close"]
-                if getattr(closes, "ndim", 1) > 1:
-                    closes = closes.iloc[:, 0]
-                closes = closes.dropna()
-
-                if closes.empty:
-                    logger.debug(f"Close series empty for {symbol} at {period}/{interval}")
-                    break
-
-                last_price = float(closes.iloc[-1])
-                last_timestamp = closes.index[-1]
-                # last_timestamp can be pd.Timestamp; convert to python datetime
-                last_dt = last_timestamp.to_pydatetime()
-                return last_price, last_dt
-            except Exception as exc:
-                if attempt < max_retries - 1:
-                    delay = base_delay + random.uniform(0, 0.5)
-                    logger.warning(f"Failed to get {symbol} data for {period}/{interval} (attempt {attempt + 1}): {exc}. Retrying in {delay:.1f}s...")
-                    time.sleep(delay)
-                else:
-                    logger.warning(f"Failed to get {symbol} data for {period}/{interval} after {max_retries} attempts: {exc}")
-                    break
-
-    # Fallback to fast_info if available
-    for attempt in range(max_retries):
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.fast_info
-            last = getattr(info, "last_price", None) or getattr(info, "lastPrice", None) or info.get("last_price", None)
-            if last is not None:
-                # fast_info does not provide a reliable timestamp, so we don't return one
-                return float(last), None
-        except Exception as exc:
-            if attempt < max_retries - 1:
-                delay = base_delay + random.uniform(0, 0.5)
-                logger.warning(f"Failed to get {symbol} fast_info (attempt {attempt + 1}): {exc}. Retrying in {delay:.1f}s...")
-                time.sleep(delay)
-            else:
-                logger.warning(f"Failed to get {symbol} fast_info after {max_retries} attempts: {exc}")
-                break
+def _try_get_prev_close(symbol: str, daily_closes: Optional[List[Tuple[datetime, float]]] = None) -> Optional[float]:
+    """
+    Previous close from recent daily candles, fetched unless `daily_closes` is given.
+    Cached for the rest of the trading day once today's candle exists.
+    """
+    today = datetime.now(_MARKET_TZ).date()
+    cached = _prev_close_cache.get((symbol, today))
+    if cached is not None:
+        logger.debug(f"Using cached previous close for {symbol}")
+        return cached
+
+    closes = daily_closes if daily_closes is not None else _try_get_daily_closes(symbol)
+    if not closes:
+        return None
 
-    return None
+    if len(closes) >= 2:
+        prev_close = closes[-2][1]
+        # Only once today's candle exists is closes[-2] fixed for the rest of the day
+        if closes[-1][0].astimezone(_MARKET_TZ).date() == today:
+            with _cache_lock:
+                for key in [k for k in _prev_close_cache if k[1] != today]:
+                    del _prev_close_cache[key]
+                _prev_close_cache[(symbol, today)] = prev_close
+        return prev_close
+    return closes[-1][1]
+
+
+def _is_market_open() -> bool:
+    """Whether TASE is currently inside today's trading session."""
+    now = datetime.now(_MARKET_TZ)
+    day_info = get_trading_day_info(now)
+    if not day_info.is_trading:
+        return False
+    return day_info.start_time <= now.time() < day_info.stop_time
+
+
+def _try_get_last_price(symbol: str) -> Optional[Tuple[float, datetime]]:
+    """Fetch the latest intraday close price with retry logic."""
+    for period, interval in [("1d", "1m"), ("5d", "5m")]:
+        closes = _with_retries(
+            f"{symbol} data for {period}/{interval}",
+            lambda: _fetch_chart_closes(symbol, period, interval),
+        )
+        if closes:
+            last_dt, last_price = closes[-1]
+            return last_price, last_dt
+        logger.debug(f"No intraday data returned for {symbol} at {period}/{interval}")
+
+    # Fall back to the chart metadata's regular market price
+    meta = _with_retries(
+        f"{symbol} chart metadata",
+        lambda: (_fetch_chart(symbol, "1d", "1d") or {}).get("meta") or {},
+    ) or {}
+    last = meta.get("regularMarketPrice")
+    if last is None:
+        return None
+    market_time = meta.get("regularMarketTime")
+    last_dt = datetime.fromtimestamp(int(market_time), tz=timezone.utc) if market_time else None
+    return float(last), last_dt
 
 
 def fetch_index(name: str, symbol: str, spark_data: Optional[Dict[str, Dict[str, float]]] = None) -> Optional[IndexQuote]:
     """
     Fetch last price and previous close for one index.
     If primary symbol fails, try alternative symbols if configured.
-    Uses caching to reduce API calls.
+    A spark hit always wins, so the quote matches the spark data behind spark_digest();
+    otherwise caching reduces API calls, and a quote up to STALE_TTL old is returned
+    while it refreshes in the background.
     """
     cache_key = f"{name}_{symbol}"
+    symbols_to_try = [symbol, *ALT_SYMBOLS.get(symbol, ())]
+
+    # A spark hit for any candidate is a plain dict lookup, so resolve those before the cache
+    spark_data = spark_data or {}
+    for attempt_symbol in symbols_to_try:
+        data_point = spark_data.get(attempt_symbol)
+        if data_point:
+            logger.info(f"Using Yahoo spark data for {name} ({attempt_symbol})")
+            quote = IndexQuote(
+                name=name,
+                symbol=attempt_symbol,
+                price=data_point["price"],
+                prev_close=data_point["prev_close"],
+                price_date=datetime.fromtimestamp(int(data_point["timestamp"]), tz=timezone.utc),
+            )
+            _cache_data(cache_key, quote)
+            return quote
+
     cached_data = _get_cached_data(cache_key)
     if cached_data:
         return cached_data
 
-    symbols_to_try = [symbol]
-    if symbol in ALT_SYMBOLS:
-        symbols_to_try.extend(ALT_SYMBOLS[symbol])
+    # Without a spark hit, an expired-but-recent quote beats blocking on per-symbol requests
+    stale_data = _get_cached_data(cache_key, max_age=STALE_TTL)
+    if stale_data:
+        _refresh_in_background(name, symbol)
+        return stale_data
+
+    return _fetch_index_direct(name, symbol)
 
-    spark_data = spark_data or {}
+
+def _fetch_index_direct(name: str, symbol: str) -> Optional[IndexQuote]:
+    """Fetch one index with per-symbol Yahoo requests, then the alternative source, and cache the result."""
+    cache_key = f"{name}_{symbol}"
+    failed_at = _negative_cache.get(cache_key)
+    if failed_at is not None and time.time() - failed_at < NEG_TTL:
+        logger.info(f"Skipping {cache_key}; all sources failed {time.time() - failed_at:.0f}s ago")
+        return None
+
+    symbols_to_try = [symbol, *ALT_SYMBOLS.get(symbol, ())]
 
     for attempt_symbol in symbols_to_try:
         logger.info(f"Attempting to fetch data for {name} using symbol: {attempt_symbol}")
 
-        price: Optional[float] = None
-        prev_close: Optional[float] = None
-        price_date: Optional[datetime] = None
+        if _is_market_open():
+            # The intraday and daily requests are independent, so overlap them
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                prev_future = pool.submit(_try_get_prev_close, attempt_symbol)
+                price_info = _try_get_last_price(attempt_symbol)
+                prev_close = prev_future.result()
+        else:
+            # Outside the session there are no new intraday bars; the last daily close is the price
+            daily_closes = _try_get_daily_closes(attempt_symbol) or []
+            price_info = (daily_closes[-1][1], daily_closes[-1][0]) if daily_closes else None
+            prev_close = _try_get_prev_close(attempt_symbol, daily_closes)
 
-        data_point = spark_data.get(attempt_symbol)
-        if data_point:
-            price = data_point.get("price")
-            prev_close = data_point.get("prev_close")
-            timestamp = data_point.get("timestamp")
-            if price is not None and prev_close is not None and timestamp is not None:
-                logger.info(f"Using Yahoo spark data for {name} ({attempt_symbol})")
-                price_date = datetime.fromtimestamp(int(timestamp))
-
-        if price is None:
-            price_info = _try_get_last_price(attempt_symbol)
-            if price_info:
-                price, price_date = price_info
-
-        if price is None:
+        if price_info is None:
             logger.warning(f"Failed to get last price for {attempt_symbol}")
             continue
+        price, price_date = price_info
 
-        if prev_close is None:
-            prev_close = _try_get_prev_close(attempt_symbol)
         if prev_close is None:
             logger.warning(f"Failed to get previous close for {attempt_symbol}")
             continue
@@ -329,6 +581,9 @@ def fetch_index(name: str, symbol: str, spark_data: Optional[Dict[str, Dict[str,
     logger.info(f"Trying alternative data source for {name}")
 
     try:
+        # Imported on first use: lxml is only needed once every Yahoo symbol has failed
+        from alternative_data_source import get_index_data_from_alternative_source
+
         alt_data = get_index_data_from_alternative_source(name)
         if alt_data:
             quote = IndexQuote(
@@ -344,35 +599,35 @@ def fetch_index(name: str, symbol: str, spark_data: Optional[Dict[str, Dict[str,
     except Exception as e:  # noqa: BLE001 - we deliberately log any failure
         logger.warning(f"Alternative data source also failed for {name}: {e}")
 
+    _negative_cache[cache_key] = time.time()
     return None
 
 
-def fetch_all(indices_map: dict[str, str]) -> List[IndexQuote]:
-    """Fetch all indices defined in the configuration with respectful delays."""
-    out: List[IndexQuote] = []
+def spark_digest() -> Optional[bytes]:
+    """Digest of the spark data behind the last fetch_all, or None if per-symbol sources were needed."""
+    return _spark_digest
 
-    symbols_to_prefetch = set(indices_map.values())
-    for sym in indices_map.values():
-        symbols_to_prefetch.update(ALT_SYMBOLS.get(sym, []))
 
-    spark_data = _fetch_spark_batch(symbols_to_prefetch)
+def fetch_all(indices_map: dict[str, str]) -> List[IndexQuote]:
+    """Fetch all indices defined in the configuration, concurrently where Yahoo is hit per symbol."""
+    candidate_map = {name: (symbol, *ALT_SYMBOLS.get(symbol, ())) for name, symbol in indices_map.items()}
+    symbols_to_prefetch = {s for candidates in candidate_map.values() for s in candidates}
+
+    global _spark_digest
+    digest = hashlib.blake2b(digest_size=16)
+    spark_data = _fetch_spark_batch(symbols_to_prefetch, digest)
+    spark_keys = spark_data.keys()
+    covered = all(not spark_keys.isdisjoint(candidates) for candidates in candidate_map.values())
+    _spark_digest = digest.digest() if spark_data and covered else None
     if spark_data:
         logger.info(f"Prefetched Yahoo spark data for {len(spark_data)} symbols")
     else:
-        logger.warning("Yahoo spark prefetch returned no data; falling back to yfinance per symbol")
+        logger.warning("Yahoo spark prefetch returned no data; falling back to per-symbol requests")
 
+    # Spark hits resolve instantly; the rest wait on Yahoo, so overlap those requests
     items = list(indices_map.items())
-    for idx, (name, symbol) in enumerate(items):
-        candidate_symbols = [symbol] + ALT_SYMBOLS.get(symbol, [])
-        spark_available = any(spark_data.get(sym) for sym in candidate_symbols)
-
-        quote = fetch_index(name, symbol, spark_data=spark_data)
-        if quote:
-            out.append(quote)
-
-        if idx < len(items) - 1 and not spark_available:
-            logger.info("Waiting 1 second before next request to respect rate limiting when using yfinance fallback...")
-            time.sleep(1)
+    with ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as pool:
+        quotes = pool.map(lambda item: fetch_index(item[0], item[1], spark_data=spark_data), items)
+        out = [q for q in quotes if q]
 
     return out
-
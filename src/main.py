@@ -1,30 +1,48 @@
 ﻿import os
 import asyncio
-from typing import Optional
-
-# Work around yfinance's optional curl_cffi transport causing attribute errors in some environments
-# This MUST be set before any yfinance import (which happens in indices module)
-os.environ["YF_USE_CURL_CFFI"] = "false"
-os.environ["YF_DISABLE_CURL_CFFI"] = "true"
+import hashlib
+import random
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
 
 from telegram import Bot
 from dotenv import load_dotenv
-from telegram.error import InvalidToken, TimedOut, BadRequest, Forbidden
+from telegram.error import InvalidToken, TimedOut, BadRequest, Forbidden, RetryAfter
+from telegram.helpers import escape_markdown
 from telegram.request import HTTPXRequest
 
 from settings import settings
-from indices import fetch_all
+from indices import fetch_all, spark_digest
 from formatter import build_message
 from tase_calendar import TradingDayInfo
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
-
-UPDATE_INTERVAL_SEC = 300
-SEND_RETRY_DELAYS = [0, 2, 4]
+# Ensure .env values override any existing environment variables; once per process, not per session
+load_dotenv(override=True)
+
+# Spread refreshes by up to ±10% so replicas don't poll Yahoo in lockstep
+INTERVAL_JITTER = 0.1
+# Telegram calls: honour RetryAfter exactly, back off exponentially (capped) on timeouts
+TG_MAX_ATTEMPTS = 8
+TG_MAX_BACKOFF_SEC = 60
+# Outbound limits under Telegram's ~30 msg/s per bot and ~1 msg/s per chat
+TG_GLOBAL_RATE = 25.0
+TG_CHAT_RATE = 1.0
 FALLBACK_TEXT = "לא הצלחתי להביא כרגע נתונים למדדים. נסו שוב מאוחר יותר."
+# Messages go out as MarkdownV2, where the bare "." in FALLBACK_TEXT is a reserved character
+_FALLBACK_TEXT_MD = escape_markdown(FALLBACK_TEXT, version=2)
 MESSAGE_ID_FILE = "message_id.txt"
 
+# The "updated at HH:MM" stamp alone shouldn't trigger an edit
+_UPDATED_AT_RE = re.compile(r"עודכן: \d{2}:\d{2}")
+
+_T = TypeVar("_T")
+
+# One Bot (and its pooled HTTPX client) per process, shared by every scheduler session
+_BOT: Optional[Bot] = None
+
 
 def _get_tz() -> ZoneInfo:
     """Resolve timezone from settings with a fallback."""
@@ -34,49 +52,160 @@ def _get_tz() -> ZoneInfo:
         return ZoneInfo("Asia/Jerusalem")
 
 
-def _read_message_id() -> Optional[int]:
-    """Read message ID if it exists and belongs to the current trading day."""
+_TZ = _get_tz()
+
+
+def _read_message_id() -> Tuple[Optional[int], bool]:
+    """
+    Read message ID if it exists and belongs to the current trading day,
+    plus whether pinning it is settled (older two-field files count as settled).
+    """
     if not os.path.exists(MESSAGE_ID_FILE):
-        return None
+        return None, False
 
     with open(MESSAGE_ID_FILE, "r") as f:
         content = f.read().strip()
 
     parts = content.split(",")
-    if len(parts) != 2:
-        return None
+    if len(parts) == 2:
+        parts.append("1")
+    if len(parts) != 3:
+        return None, False
 
-    message_id_str, date_str = parts
+    message_id_str, date_str, pin_done_str = parts
     if not message_id_str.isdigit():
-        return None
+        return None, False
 
     try:
-        stored_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        stored_date = date.fromisoformat(date_str)
     except ValueError:
-        return None
+        return None, False
 
-    tz = _get_tz()
-    today = datetime.now(tz).date()
+    today = datetime.now(_TZ).date()
 
     if stored_date == today:
-        return int(message_id_str)
+        return int(message_id_str), pin_done_str == "1"
+
+    return None, False
+
+
+def _text_hash(text: str) -> bytes:
+    """Digest of the message with its update timestamp removed."""
+    return hashlib.blake2b(_UPDATED_AT_RE.sub("", text).encode("utf-8"), digest_size=16).digest()
+
+
+def _write_message_id(message_id: int, pin_done: bool) -> None:
+    """Write message ID, current date and pin state to file, atomically via a temp file and rename."""
+    today_str = datetime.now(_TZ).date().isoformat()
+    tmp_path = MESSAGE_ID_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(f"{message_id},{today_str},{int(pin_done)}")
+    os.replace(tmp_path, MESSAGE_ID_FILE)
+
+
+class _AsyncTokenBucket:
+    """Asyncio token bucket: bursts up to `capacity`, refills at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Take one token, waiting (in FIFO order) until one is available."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_tg_global_bucket = _AsyncTokenBucket(rate=TG_GLOBAL_RATE, capacity=TG_GLOBAL_RATE)
+_tg_chat_buckets: Dict[str, _AsyncTokenBucket] = {}
+
+
+async def _tg_throttle(chat_id: str) -> None:
+    """Wait for both the bot-wide and the per-chat send budget."""
+    await _tg_global_bucket.acquire()
+    bucket = _tg_chat_buckets.setdefault(chat_id, _AsyncTokenBucket(rate=TG_CHAT_RATE, capacity=1))
+    await bucket.acquire()
+
+
+async def _tg_call(chat_id: str, call: Callable[[], Awaitable[_T]]) -> _T:
+    """
+    Run a Bot API call against `chat_id` within the outbound rate limits,
+    retrying on 429 RetryAfter and timeouts; the last attempt's error propagates.
+    """
+    for attempt in range(TG_MAX_ATTEMPTS - 1):
+        try:
+            await _tg_throttle(chat_id)
+            return await call()
+        except RetryAfter as exc:
+            retry_after = exc.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            delay = float(retry_after) + random.uniform(0, 0.5)
+            print(f"[WARN] Telegram rate limit hit, retrying in {delay:.1f} seconds...")
+        except TimedOut:
+            delay = min(TG_MAX_BACKOFF_SEC, 2 ** attempt) + random.random()
+            print(f"[WARN] Timeout, retrying in {delay:.1f} seconds...")
+        await asyncio.sleep(delay)
+    await _tg_throttle(chat_id)
+    return await call()
+
+
+async def _pin_message(bot: Bot, chat_id: str, message_id: int) -> bool:
+    """Pin the message; False only when the attempt timed out and is worth repeating."""
+    try:
+        await _tg_call(chat_id, lambda: bot.pin_chat_message(
+            chat_id=chat_id,
+            message_id=message_id,
+            disable_notification=True,
+        ))
+        print("[OK] Message pinned successfully.")
+    except Forbidden as exc:
+        print(f"[WARN] Bot lacks rights to pin message: {exc}")
+    except BadRequest as exc:
+        print(f"[WARN] Failed to pin message: {exc}")
+    except (TimedOut, RetryAfter):
+        print("[WARN] Pin request timed out; will retry on next cycle.")
+        return False
+    return True
+
+
+async def _get_bot(token: str) -> Bot:
+    """Return the shared Bot, creating and validating it on first use or when the token changes."""
+    global _BOT
+    if _BOT is not None and _BOT.token == token:
+        return _BOT
 
-    return None
+    # Use more generous HTTP timeouts to avoid spurious startup failures
+    request = HTTPXRequest(read_timeout=30.0, write_timeout=30.0, connect_timeout=10.0, pool_timeout=10.0)
+    bot = Bot(token=token, request=request)
 
+    # Validate token early with getMe for a clearer error
+    try:
+        await bot.get_me()
+    except InvalidToken:
+        raise SystemExit(
+            "Invalid TELEGRAM_BOT_TOKEN (Unauthorized). Check the token with @BotFather and update .env."
+        )
+    except TimedOut:
+        # Network is slow or blocked; proceed and let send attempt retries handle it
+        pass
 
-def _write_message_id(message_id: int) -> None:
-    """Write message ID and current date to file."""
-    tz = _get_tz()
-    today_str = datetime.now(tz).date().isoformat()
-    with open(MESSAGE_ID_FILE, "w") as f:
-        f.write(f"{message_id},{today_str}")
+    _BOT = bot
+    return bot
 
 
 async def main(run_once: bool = False, market_open: bool = True, day_info: Optional[TradingDayInfo] = None) -> None:
-    """Send indices update message and refresh it every 5 minutes."""
-    # Ensure .env values override any existing environment variables
-    load_dotenv(override=True)
-
+    """Send indices update message and refresh it on the configured market/off-hours interval."""
     token = (os.getenv("TELEGRAM_BOT_TOKEN") or "").strip()
     chat_id = (os.getenv("TELEGRAM_CHAT") or "").strip()
 
@@ -89,30 +218,35 @@ async def main(run_once: bool = False, market_open: bool = True, day_info: Optio
         print("Please create a .env file with your chat ID. See README.md for details.")
         return
 
-    # Use more generous HTTP timeouts to avoid spurious startup failures
-    request = HTTPXRequest(read_timeout=30.0, write_timeout=30.0, connect_timeout=10.0, pool_timeout=10.0)
-    bot = Bot(token=token, request=request)
-
-    # Validate token early with getMe for a clearer error
-    try:
-        await bot.get_me()
-    except InvalidToken:
-        raise SystemExit(
-            "Invalid TELEGRAM_BOT_TOKEN (Unauthorized). Check the token with @BotFather and update .env."
-        )
-    except TimedOut:
-        # Network is slow or blocked; proceed and let send attempt retries handle it
-        pass
+    bot = await _get_bot(token)
 
-    message_id = _read_message_id()
-    last_text = None
+    message_id, pin_done = await asyncio.to_thread(_read_message_id)
+    last_text_hash = None
+    last_digest = None
 
     while True:
+        if message_id is not None and not pin_done:
+            pin_done = await _pin_message(bot, chat_id, message_id)
+            if pin_done:
+                await asyncio.to_thread(_write_message_id, message_id, pin_done)
+
         indices_map = settings.indices_map()
-        quotes = fetch_all(indices_map)
+        # fetch_all blocks on HTTP and fans out over its own thread pool; keep the event loop free
+        quotes = await asyncio.to_thread(fetch_all, indices_map)
+        interval = settings.update_interval_sec if market_open else settings.off_hours_interval_sec
+        sleep_for = interval * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+
+        # Identical spark bytes mean identical quotes; skip formatting and the Telegram round-trip
+        digest = spark_digest()
+        if message_id is not None and digest is not None and digest == last_digest:
+            print("[INFO] Yahoo data unchanged; skipping message rebuild.")
+            if run_once:
+                return
+            await asyncio.sleep(sleep_for)
+            continue
 
         if not quotes:
-            text = FALLBACK_TEXT
+            text = _FALLBACK_TEXT_MD
         else:
             text = build_message(
                 quotes=quotes,
@@ -125,73 +259,58 @@ async def main(run_once: bool = False, market_open: bool = True, day_info: Optio
         print(f"[INFO] Message preview: {text[:100]}...")
 
         if message_id is None:
-            send_success = False
-            for attempt in range(len(SEND_RETRY_DELAYS)):
-                try:
-                    msg = await bot.send_message(
-                        chat_id=chat_id,
-                        text=text,
-                        parse_mode="MarkdownV2",
-                        disable_web_page_preview=True,
-                    )
-                    message_id = msg.message_id
-                    _write_message_id(message_id)
-                    last_text = text
-                    try:
-                        await bot.pin_chat_message(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            disable_notification=True,
-                        )
-                        print("[OK] Message pinned successfully.")
-                    except Forbidden as exc:
-                        print(f"[WARN] Bot lacks rights to pin message: {exc}")
-                    except BadRequest as exc:
-                        print(f"[WARN] Failed to pin message: {exc}")
-                    except TimedOut:
-                        print("[WARN] Pin request timed out; will retry on next cycle.")
-                    send_success = True
-                    print("[OK] Message sent successfully to Telegram!")
-                    break
-                except TimedOut:
-                    if attempt < len(SEND_RETRY_DELAYS) - 1:
-                        delay = SEND_RETRY_DELAYS[attempt + 1]
-                        print(f"[WARN] Timeout, retrying in {delay} seconds...")
-                        await asyncio.sleep(delay)
-                        continue
-                    print("[ERROR] Failed to send message after retries")
-            if not send_success:
+            try:
+                msg = await _tg_call(chat_id, lambda: bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode="MarkdownV2",
+                    disable_web_page_preview=True,
+                ))
+            except (TimedOut, RetryAfter):
+                print("[ERROR] Failed to send message after retries")
                 return
+            message_id = msg.message_id
+            last_text_hash = _text_hash(text)
+            last_digest = digest
+            await asyncio.to_thread(_write_message_id, message_id, False)
+            pin_done = await _pin_message(bot, chat_id, message_id)
+            if pin_done:
+                await asyncio.to_thread(_write_message_id, message_id, pin_done)
+            print("[OK] Message sent successfully to Telegram!")
             if run_once:
                 break
         else:
-            if text == last_text:
+            text_hash = _text_hash(text)
+            if text_hash == last_text_hash:
                 print("[INFO] No changes detected; skipping edit.")
+                last_digest = digest
             else:
                 try:
-                    await bot.edit_message_text(
+                    await _tg_call(chat_id, lambda: bot.edit_message_text(
                         chat_id=chat_id,
                         message_id=message_id,
                         text=text,
                         parse_mode="MarkdownV2",
                         disable_web_page_preview=True,
-                    )
-                    last_text = text
+                    ))
+                    last_text_hash = text_hash
+                    last_digest = digest
                     print("[OK] Message edited successfully.")
                     if run_once:
                         break
                 except BadRequest as exc:
                     if "message is not modified" in str(exc).lower():
                         print("[INFO] Telegram reported message is not modified; skipping.")
+                        last_text_hash = text_hash
                     else:
                         print(f"[ERROR] Failed to edit message: {exc}")
-                except TimedOut:
+                except (TimedOut, RetryAfter):
                     print("[WARN] Edit timed out; will retry on next cycle.")
 
         if run_once:
             return
 
-        await asyncio.sleep(UPDATE_INTERVAL_SEC)
+        await asyncio.sleep(sleep_for)
 
 
 if __name__ == "__main__":
@@ -3,8 +3,8 @@
 import asyncio
 from contextlib import suppress
 from datetime import datetime, time, timedelta
+from time import monotonic
 from zoneinfo import ZoneInfo
-from typing import Optional, Tuple
 
 from settings import settings
 from main import main as run_bot_main
@@ -39,12 +39,10 @@ def _is_within_session(moment: datetime, day_info: TradingDayInfo) -> bool:
 
 async def _sleep_until(target: datetime) -> None:
     """Sleep until a target datetime is reached."""
-    while True:
-        now = datetime.now(TZ)
-        remaining = (target - now).total_seconds()
-        if remaining <= 0:
-            return
-        await asyncio.sleep(min(remaining, _SLEEP_GRANULARITY_SEC))
+    # Convert to a monotonic deadline once, so NTP or manual clock changes can't stretch the wait.
+    # Subtract POSIX timestamps: same-tzinfo datetime subtraction ignores DST and measures wall-clock time.
+    deadline = monotonic() + (target.timestamp() - datetime.now(TZ).timestamp())
+    await asyncio.sleep(max(0.0, deadline - monotonic()))
 
 
 async def _run_session(stop_at: datetime, day_info: TradingDayInfo) -> None:
@@ -65,10 +63,7 @@ async def _run_session(stop_at: datetime, day_info: TradingDayInfo) -> None:
             await bot_task
         raise
     else:
-        try:
-            bot_task.result()
-        except Exception:
-            raise
+        bot_task.result()  # re-raises if the bot task failed
         raise SystemExit("[ERROR] Bot task finished before the scheduled stop time. See logs above.")
 
 
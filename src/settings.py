@@ -15,6 +15,7 @@ and swapping providers (e.g., data source) trivial.
 
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from functools import lru_cache
 import os
 from typing import Dict
 
@@ -39,16 +40,20 @@ class Settings:
     def indices_map(self) -> Dict[str, str]:
         """
         Parse the comma-separated string of name=symbol pairs into a dict.
+        Parsed once per distinct string; treat the returned dict as read-only.
 
         Example:
             "TA-35=TA35.TA,TA-125=^TA125.TA" -> {"TA-35": "TA35.TA", "TA-125": "^TA125.TA"}
         """
-        out: Dict[str, str] = {}
-        for pair in self.indices_raw.split(","):
-            if "=" in pair:
-                name, symbol = pair.split("=", 1)
-                out[name.strip()] = symbol.strip()
-        return out
+        return _parse_indices(self.indices_raw)
+
+
+@lru_cache(maxsize=4)
+def _parse_indices(raw: str) -> Dict[str, str]:
+    return {
+        name.strip(): symbol.strip()
+        for name, symbol in (pair.split("=", 1) for pair in raw.split(",") if "=" in pair)
+    }
 
 
 settings = Settings()
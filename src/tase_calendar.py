@@ -8,10 +8,11 @@ change in trading days from 2026.
 
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import date, datetime, time
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
 from typing import Optional, Tuple
 
-@dataclass
+@dataclass(frozen=True)
 class TradingDayInfo:
     """Holds all relevant information about a trading day's schedule."""
     is_trading: bool
@@ -74,65 +75,80 @@ _SHORT_DAYS_2026 = {
 }
 
 
+# Merged lookups and constants used by every schedule check
+_ALL_HOLIDAYS = {**_HOLIDAYS_2025, **_HOLIDAYS_2026}
+_ALL_SHORT_DAYS = {**_SHORT_DAYS_2025, **_SHORT_DAYS_2026}
+# From Jan 5, 2026 the trading week moves from Sun-Thu to Mon-Fri
+_WEEK_CHANGE = date(2026, 1, 5)
+# Trading weekdays as bitmasks, bit n set for weekday n (Mon=0 .. Sun=6)
+_TRADING_PRE = (1 << 6) | (1 << 0) | (1 << 1) | (1 << 2) | (1 << 3)
+_TRADING_POST = (1 << 0) | (1 << 1) | (1 << 2) | (1 << 3) | (1 << 4)
+_START = time(9, 25)
+# Stop times are 20 minutes after the session ends because of the delay in the data
+_STOP_SHORT = time(14, 45)
+_STOP_SUNDAY = time(15, 50)
+_STOP_FRIDAY = time(13, 50)
+_STOP_REGULAR = time(17, 45)
+
+
 def get_trading_day_info(moment: datetime) -> TradingDayInfo:
     """
     Get all schedule-related information for a given datetime.
     This is the main entry point for the calendar module.
     """
     d = moment.date()
-    year = d.year
+    info = _CALENDAR.get(d)
+    return info if info is not None else _trading_day_info_for(d)
+
+
+@lru_cache(maxsize=64)
+def _trading_day_info_for(d: date) -> TradingDayInfo:
+    """Schedule for one calendar date; dates outside _CALENDAR are computed here and memoized."""
     weekday = d.weekday()
 
     # Check for holidays
-    holidays = _HOLIDAYS_2025 if year == 2025 else _HOLIDAYS_2026
-    if d in holidays:
-        return TradingDayInfo(is_trading=False, reason=holidays[d])
+    holiday = _ALL_HOLIDAYS.get(d)
+    if holiday is not None:
+        return TradingDayInfo(is_trading=False, reason=holiday)
 
     # Determine trading day based on week structure
-    is_trading_weekday = False
-    if year < 2026 or (year == 2026 and d.month == 1 and d.day < 5):
-        # Before Jan 5, 2026, trading is Sunday (6) to Thursday (3)
-        if weekday in {6, 0, 1, 2, 3}:
-            is_trading_weekday = True
-    else:
-        # From Jan 5, 2026, trading is Monday (0) to Friday (4)
-        if weekday in {0, 1, 2, 3, 4}:
-            is_trading_weekday = True
-            
-    if not is_trading_weekday:
+    pre_change = d < _WEEK_CHANGE
+    if not ((_TRADING_PRE if pre_change else _TRADING_POST) >> weekday) & 1:
         return TradingDayInfo(is_trading=False, reason="סוף שבוע")
 
-    # If we are here, it's a trading day. Now let's get the hours.
-    start_time = time(9, 25)
-
     # Check for shortened trading days (Chol HaMoed)
-    short_days = _SHORT_DAYS_2025 if year == 2025 else _SHORT_DAYS_2026
-    if d in short_days:
+    short_reason = _ALL_SHORT_DAYS.get(d)
+    if short_reason is not None:
         return TradingDayInfo(
             is_trading=True,
             is_short=True,
-            reason=short_days[d],
-            start_time=start_time,
-            stop_time=time(14, 45) # stop the bot 20 minutes after the end of the trading day because of the delay in the data
+            reason=short_reason,
+            start_time=_START,
+            stop_time=_STOP_SHORT,
         )
 
-    # Regular trading hours
-    stop_time = None
-    if year < 2026 or (year == 2026 and d.month == 1 and d.day < 5):
-        # Schedule until Jan 5, 2026 (Sun-Thu)
-        if weekday == 6:  # Sunday
-            stop_time = time(15, 50)
-        else:  # Monday to Thursday
-            stop_time = time(17, 45) # stop the bot 20 minutes after the end of the trading day because of the delay in the data
+    # Regular trading hours: Sundays (until the week change) and Fridays close early
+    if pre_change:
+        stop_time = _STOP_SUNDAY if weekday == 6 else _STOP_REGULAR
     else:
-        # Schedule from Jan 5, 2026 onwards (Mon-Fri)
-        if weekday == 4:  # Friday
-            stop_time = time(13, 50)
-        else:  # Monday to Thursday
-            stop_time = time(17, 45) # stop the bot 20 minutes after the end of the trading day because of the delay in the data
-            
+        stop_time = _STOP_FRIDAY if weekday == 4 else _STOP_REGULAR
+
     return TradingDayInfo(
         is_trading=True,
-        start_time=start_time,
+        start_time=_START,
         stop_time=stop_time
     )
+
+
+def _build_calendar(first: date, last: date) -> dict:
+    """Precompute the (immutable) schedule for every date in [first, last]."""
+    calendar = {}
+    d = first
+    while d <= last:
+        calendar[d] = _trading_day_info_for.__wrapped__(d)
+        d += timedelta(days=1)
+    return calendar
+
+
+# Every date the hardcoded schedule covers resolves with a single dict lookup
+_CALENDAR = _build_calendar(date(2025, 1, 1), date(2026, 12, 31))
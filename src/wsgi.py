@@ -1,20 +1,88 @@
 """WSGI application wrapper for the Telegram bot."""
 
 import asyncio
+import atexit
+import os
+import tempfile
 import threading
+from contextlib import suppress
 from flask import Flask
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, assume a single worker
+    fcntl = None
+
+try:
+    from uvloop import new_event_loop as _new_event_loop
+except ImportError:  # Windows/dev: stock asyncio loop
+    from asyncio import new_event_loop as _new_event_loop
+
 from run_bot import run_scheduled
 
 app = Flask(__name__)
 
-def run_bot_thread():
+_LOCK_PATH = os.path.join(tempfile.gettempdir(), "tase-pinned-bot.lock")
+_lock_file = None
+# Process-wide marker: a thread by this name means the bot already runs here, whichever import started it
+_BOT_THREAD_NAME = "tase-pinned-bot"
+# How long interpreter exit waits for the bot task to unwind after cancelling it
+_SHUTDOWN_TIMEOUT_SEC = 5.0
+
+
+def _is_bot_leader() -> bool:
+    """
+    Only one process may run the bot, or every gunicorn worker would post its own updates.
+    TASE_BOT_LEADER=1/0 decides explicitly; otherwise the first worker to lock the lock file wins.
+    """
+    global _lock_file
+    explicit = os.environ.get("TASE_BOT_LEADER")
+    if explicit is not None:
+        return explicit == "1"
+    if fcntl is None:
+        return True
+
+    _lock_file = open(_LOCK_PATH, "w")
+    try:
+        fcntl.flock(_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        _lock_file.close()
+        _lock_file = None
+        return False
+    return True
+
+
+def _bot_running() -> bool:
+    """Whether this process already runs the bot, e.g. when this module is imported a second time."""
+    return any(thread.name == _BOT_THREAD_NAME for thread in threading.enumerate())
+
+
+def run_bot_thread(loop: asyncio.AbstractEventLoop, task: asyncio.Task):
     """Run the bot in a separate thread."""
-    asyncio.run(run_scheduled())
+    asyncio.set_event_loop(loop)
+    with suppress(asyncio.CancelledError):
+        loop.run_until_complete(task)
+    loop.close()
+
+
+def _stop_bot(loop: asyncio.AbstractEventLoop, task: asyncio.Task, thread: threading.Thread):
+    """Cancel the bot task and give it a moment to unwind, so the loop isn't torn down mid-request."""
+    if thread.is_alive():
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(timeout=_SHUTDOWN_TIMEOUT_SEC)
+
 
-# Start the bot in a separate thread
-bot_thread = threading.Thread(target=run_bot_thread, daemon=True)
-bot_thread.start()
+# Start the bot in a separate thread, on a loop kept reachable for shutdown
+if not _bot_running() and _is_bot_leader():
+    bot_loop = _new_event_loop()
+    bot_task = bot_loop.create_task(run_scheduled())
+    bot_thread = threading.Thread(
+        target=run_bot_thread, args=(bot_loop, bot_task), name=_BOT_THREAD_NAME, daemon=True
+    )
+    bot_thread.start()
+    atexit.register(_stop_bot, bot_loop, bot_task, bot_thread)
+else:
+    print(f"[INFO] Bot not started in worker {os.getpid()}; it already runs elsewhere.")
 
 @app.route('/')
 def health_check():